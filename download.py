@@ -3,14 +3,22 @@
 🍎 Apple Music to FLAC (Ripple v3.1 Rebuilt)
 """
 
+import os
+import re
+import json
 import sys
+import time
+import queue
 import shutil
+import threading
 import subprocess
+import importlib.metadata
 from pathlib import Path
+from typing import Optional
 
 # Import TUI components
 from tui import (
-    console, 
+    get_console,
     print_banner, 
     print_success, 
     print_error, 
@@ -21,6 +29,57 @@ from tui import (
     get_url,
     destroy_cookies_option
 )
+from flatten import AUDIO_EXTENSIONS, file_suffix, iter_files, move_file, taken_names, claim_name
+
+# Compiled once; these run for every file moved and every line of gamdl output
+_TRACK_PREFIX_RE = re.compile(r'^(?:\d+[-\s])+')
+_PLAYLIST_SLUG_RE = re.compile(r'/playlist/([^/]+)/')
+_PLAYLIST_NAME_RE = re.compile(r'playlist/([^/]+)/')
+_TRACK_PROGRESS_RE = re.compile(r'\[Track (\d+)/(\d+)\]')
+_SONG_RE = re.compile(r'Downloading "([^"]+)"')
+
+# Remembers a successful gamdl check so later runs skip the slow `gamdl --help`
+_DEPS_CACHE = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "apple-music-to-flac" / "deps.json"
+
+def _gamdl_cache_key() -> Optional[list]:
+    """Identify the interpreter + gamdl install, or None if unknown."""
+    try:
+        return [sys.executable, os.stat(sys.executable).st_mtime_ns, importlib.metadata.version("gamdl")]
+    except (OSError, importlib.metadata.PackageNotFoundError):
+        return None
+
+def check_gamdl() -> bool:
+    """
+    Check that gamdl runs. The result is cached on disk, keyed on the
+    interpreter and gamdl version, so repeat runs don't cold-start gamdl.
+    """
+    key = _gamdl_cache_key()
+    if key is not None:
+        try:
+            if json.loads(_DEPS_CACHE.read_text()).get("gamdl") == key:
+                return True
+        except (OSError, ValueError, AttributeError):
+            pass  # No usable cache
+    
+    try:
+        result = subprocess.run(
+            [sys.executable, "-m", "gamdl", "--help"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+    except Exception:
+        return False
+    if result.returncode != 0:
+        return False
+    
+    if key is not None:
+        try:
+            _DEPS_CACHE.parent.mkdir(parents=True, exist_ok=True)
+            _DEPS_CACHE.write_text(json.dumps({"gamdl": key}))
+        except OSError:
+            pass  # Caching is best-effort
+    return True
 
 def check_dependencies() -> bool:
     """Check if external dependencies are installed."""
@@ -29,10 +88,7 @@ def check_dependencies() -> bool:
     if not shutil.which("ffmpeg"):
         missing.append("ffmpeg")
     
-    # Check gamdl
-    try:
-        subprocess.run([sys.executable, "-m", "gamdl", "--help"], capture_output=True)
-    except Exception:
+    if not check_gamdl():
         missing.append("gamdl")
         
     if missing:
@@ -53,54 +109,94 @@ def strip_track_number(filename: str) -> str:
     - "1-05 Song Name.flac" → "Song Name.flac"
     - "05 Song.m4a" → "Song.m4a"
     """
-    import re
     # Match patterns like "01 ", "1-05 ", "05-", etc.
-    cleaned = re.sub(r'^(\d+[-\s])+', '', filename)
-    return cleaned if cleaned else filename
+    cleaned = _TRACK_PREFIX_RE.sub('', filename)
+    return cleaned or filename
 
-def move_new_files(temp_dir: Path, target_dir: Path, already_moved: set, include_lrc: bool = True) -> list:
+def _scan_new_files(root: Path, extensions: frozenset, dir_cache: dict) -> list:
+    """
+    Collect paths (as str) of files under root whose suffix is in extensions.
+    Directories whose mtime hasn't changed since the last scan are not
+    re-listed; only their cached subdirectories are visited.
+    
+    Args:
+        dir_cache: Maps directory path -> (mtime_ns, subdirs). Updated in place.
+    """
+    found = []
+    stack = [str(root)]
+    while stack:
+        path = stack.pop()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            dir_cache.pop(path, None)
+            continue
+        
+        cached = dir_cache.get(path)
+        if cached and cached[0] == mtime:
+            stack.extend(cached[1])
+            continue
+        
+        subdirs = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_symlink():
+                        continue  # Same rule as flatten's walk: symlinks are left alone
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif file_suffix(entry.name) in extensions:
+                        found.append(entry.path)
+        except OSError:
+            continue  # Directory vanished mid-scan
+        
+        dir_cache[path] = (mtime, subdirs)
+        stack.extend(subdirs)
+    
+    return found
+
+def move_new_files(temp_dir: Path, target_dir: Path, include_lrc: bool = True, dir_cache: dict = None) -> list:
     """
     Move any new audio and optionally .lrc files from temp to target directory.
-    Strips track number prefixes from filenames.
+    Strips track number prefixes from filenames. A moved file no longer
+    exists in temp, so nothing needs to remember what was already moved.
     
     Args:
         include_lrc: If True, move .lrc files too. If False, only audio files.
+        dir_cache: Directory mtimes from the previous call, so unchanged
+            folders are skipped. Pass the same dict on every tick.
     """
-    import shutil
-    
-    audio_extensions = ['.m4a', '.flac', '.mp3', '.opus', '.aac']
     if include_lrc:
-        all_extensions = audio_extensions + ['.lrc']
+        all_extensions = AUDIO_EXTENSIONS | {'.lrc'}
     else:
-        all_extensions = audio_extensions
+        all_extensions = AUDIO_EXTENSIONS
+    
+    if dir_cache is None:
+        dir_cache = {}
+    
+    found = _scan_new_files(temp_dir, all_extensions, dir_cache)
+    if not found:
+        return []  # Idle tick; don't list the target folder for nothing
     
     newly_moved = []
+    taken = taken_names(target_dir)
+    target_root = os.fspath(target_dir)
     
-    for ext in all_extensions:
-        for file in temp_dir.rglob(f'*{ext}'):
-            if str(file) in already_moved:
-                continue
-            
-            # Strip track number prefix from filename
-            clean_name = strip_track_number(file.name)
-            target_path = target_dir / clean_name
-            
-            # Handle duplicates
-            if target_path.exists():
-                stem = Path(clean_name).stem
-                suffix = file.suffix
-                counter = 1
-                while target_path.exists():
-                    target_path = target_dir / f"{stem}_{counter}{suffix}"
-                    counter += 1
-            
-            try:
-                shutil.move(str(file), str(target_path))
-                already_moved.add(str(file))
-                if file.suffix in audio_extensions:  # Only count audio files
-                    newly_moved.append(clean_name)
-            except Exception:
-                pass  # File might still be writing
+    for src in found:
+        parent, name = os.path.split(src)
+        
+        # Strip track number prefix from filename, handling duplicates
+        clean_name = strip_track_number(name)
+        target_name = claim_name(clean_name, taken)
+        
+        try:
+            move_file(src, os.path.join(target_root, target_name))
+            if file_suffix(name) in AUDIO_EXTENSIONS:  # Only count audio files
+                newly_moved.append(clean_name)
+        except Exception:
+            # File might still be writing; rescan its folder next tick
+            taken.discard(target_name.casefold())
+            dir_cache.pop(parent, None)
     
     return newly_moved
 
@@ -112,18 +208,13 @@ def flatten_downloads(temp_dir: Path, final_dir: Path, playlist_name: str = None
     Args:
         include_lrc: If True, move .lrc files too. If False, only audio files.
     """
-    import shutil
-    
     # File types to move
-    audio_extensions = ['.m4a', '.flac', '.mp3', '.opus', '.aac']
     if include_lrc:
-        all_extensions = audio_extensions + ['.lrc']
+        all_extensions = AUDIO_EXTENSIONS | {'.lrc'}
     else:
-        all_extensions = audio_extensions
+        all_extensions = AUDIO_EXTENSIONS
     
-    all_files = []
-    for ext in all_extensions:
-        all_files.extend(temp_dir.rglob(f'*{ext}'))
+    all_files = list(iter_files(temp_dir, all_extensions))
     
     if playlist_name:
         target_dir = final_dir / playlist_name
@@ -133,21 +224,14 @@ def flatten_downloads(temp_dir: Path, final_dir: Path, playlist_name: str = None
         target_dir.mkdir(parents=True, exist_ok=True)
     
     moved_count = 0
-    for file in all_files:
+    taken = taken_names(target_dir)
+    target_root = os.fspath(target_dir)
+    for entry in all_files:
         # Strip track number prefix
-        clean_name = strip_track_number(file.name)
-        target_path = target_dir / clean_name
-        
-        if target_path.exists():
-            stem = Path(clean_name).stem
-            suffix = file.suffix
-            counter = 1
-            while target_path.exists():
-                target_path = target_dir / f"{stem}_{counter}{suffix}"
-                counter += 1
-        shutil.move(str(file), str(target_path))
+        clean_name = strip_track_number(entry.name)
+        move_file(entry.path, os.path.join(target_root, claim_name(clean_name, taken)))
         # Only count audio files for the total
-        if file.suffix in audio_extensions:
+        if file_suffix(entry.name) in AUDIO_EXTENSIONS:
             moved_count += 1
     
     # Clean up empty temp directory
@@ -155,28 +239,32 @@ def flatten_downloads(temp_dir: Path, final_dir: Path, playlist_name: str = None
     
     return moved_count
 
+def _pump_lines(stream, lines: queue.Queue):
+    """Read stream line by line onto a queue, then push None at EOF."""
+    for line in iter(stream.readline, ''):
+        lines.put(line)
+    lines.put(None)
+
 def extract_playlist_name(url: str) -> str:
     """Extract playlist name from URL for folder naming."""
     # For library playlists like pl.u-XXX, we'll get the name from gamdl output
     # For now, extract the slug from URL or return None
-    import re
-    match = re.search(r'/playlist/([^/]+)/', url)
+    match = _PLAYLIST_SLUG_RE.search(url)
     if match:
         return match.group(1).replace('-', ' ').title()
     return None
 
-def run_download(url: str, options: dict, downloads_dir: Path, cookies_path: Path) -> bool:
+def run_download(url: str, options: dict, downloads_dir: Path, cookies_path: str) -> bool:
     """
     Run the download process for a single URL.
     - Downloads to temp folder
     - Moves files incrementally as each track completes
     - Verifies all tracks downloaded at the end
     """
-    import shutil
-    import re
-    import time
     from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn
     
+    console = get_console()
+    
     # Create temp directory for gamdl output
     temp_dir = downloads_dir / ".gamdl_temp"
     if temp_dir.exists():
@@ -190,7 +278,7 @@ def run_download(url: str, options: dict, downloads_dir: Path, cookies_path: Pat
     # Construct gamdl command
     cmd = [
         sys.executable, "-m", "gamdl",
-        "--cookies-path", str(cookies_path),
+        "--cookies-path", cookies_path,
         "--output-path", str(temp_dir),
         url
     ]
@@ -231,10 +319,7 @@ def run_download(url: str, options: dict, downloads_dir: Path, cookies_path: Pat
     detected_playlist_name = None
     downloaded_songs = []
     failed_songs = []
-    already_moved = set()
-    
-    progress_pattern = re.compile(r'\[Track (\d+)/(\d+)\]')
-    song_pattern = re.compile(r'Downloading "([^"]+)"')
+    dir_cache = {}
     
     # Determine target directory
     target_dir = downloads_dir  # Will be updated when playlist name is detected
@@ -250,19 +335,28 @@ def run_download(url: str, options: dict, downloads_dir: Path, cookies_path: Pat
         
         task_id = progress.add_task("Starting...", total=1, completed=0)
         last_move_check = time.time()
+        move_interval = 2.0
         current_song_name = None
         
+        # Read gamdl output on a separate thread so file moves keep
+        # happening on schedule even while gamdl is quiet
+        lines = queue.Queue()
+        threading.Thread(target=_pump_lines, args=(process.stdout, lines), daemon=True).start()
+        
         while True:
-            line = process.stdout.readline()
-            if not line and process.poll() is not None:
-                break
+            try:
+                line = lines.get(timeout=0.5)
+            except queue.Empty:
+                line = ''
+            if line is None:
+                break  # gamdl closed its output
             
             if line:
                 line = line.strip()
                 
                 # Extract playlist name
                 if 'Processing' in line:
-                    name_match = re.search(r'playlist/([^/]+)/', line)
+                    name_match = _PLAYLIST_NAME_RE.search(line)
                     if name_match and not detected_playlist_name:
                         raw_name = name_match.group(1)
                         detected_playlist_name = raw_name.replace('-', ' ').replace('%20', ' ')
@@ -271,14 +365,14 @@ def run_download(url: str, options: dict, downloads_dir: Path, cookies_path: Pat
                         target_dir.mkdir(parents=True, exist_ok=True)
                 
                 # Parse track progress [Track 1/99]
-                match = progress_pattern.search(line)
+                match = _TRACK_PROGRESS_RE.search(line)
                 if match:
                     current_track = int(match.group(1))
                     total_tracks = int(match.group(2))
                     progress.update(task_id, total=total_tracks, completed=current_track, 
                                    description="Downloading")
                 # Track song being downloaded
-                song_match = song_pattern.search(line)
+                song_match = _SONG_RE.search(line)
                 if song_match:
                     current_song_name = song_match.group(1)
                     # Truncate long names for display
@@ -292,12 +386,18 @@ def run_download(url: str, options: dict, downloads_dir: Path, cookies_path: Pat
                         failed_songs.append(current_song_name)
                         console.print(f"[red]✗[/red] {current_song_name[:40]} - Failed")
                 
-                # Incremental move: check for new files every few seconds
-                if time.time() - last_move_check > 2:
-                    if detected_playlist_name:
-                        include_lrc = (lyrics_option == 'lrc')
-                        move_new_files(temp_dir, target_dir, already_moved, include_lrc)
-                    last_move_check = time.time()
+            # Incremental move: check for new files every few seconds,
+            # sooner while tracks keep landing, backing off (up to 10s) when idle
+            if time.time() - last_move_check > move_interval:
+                if detected_playlist_name:
+                    include_lrc = (lyrics_option == 'lrc')
+                    if move_new_files(temp_dir, target_dir, include_lrc, dir_cache):
+                        move_interval = max(0.5, move_interval * 0.75)
+                    else:
+                        move_interval = min(10.0, move_interval * 1.5)
+                last_move_check = time.time()
+        
+        process.wait()
         
         # Mark complete
         if total_tracks > 0:
@@ -316,12 +416,7 @@ def run_download(url: str, options: dict, downloads_dir: Path, cookies_path: Pat
     remaining = flatten_downloads(temp_dir, downloads_dir, final_playlist_name, include_lrc)
     
     # Count total files in target
-    audio_extensions = ['.m4a', '.flac', '.mp3', '.opus', '.aac']
-    final_files = []
-    for ext in audio_extensions:
-        final_files.extend(target_dir.rglob(f'*{ext}'))
-    
-    files_downloaded = len(final_files)
+    files_downloaded = sum(1 for _ in iter_files(target_dir, AUDIO_EXTENSIONS))
     
     # Verification Report
     print()
@@ -365,7 +460,7 @@ def main():
         if not cookies_path:
             print_warning("No cookies selected. Exiting.")
             sys.exit(1)
-        print_success(f"Using cookies: {cookies_path.name}")
+        print_success(f"Using cookies: {os.path.basename(cookies_path)}")
         
         # 4. Main Loop
         downloads_dir = Path.cwd() / "Downloads"
@@ -3,89 +3,185 @@
 Flatten Downloads folder to simple structure:
 - All audio files moved directly to Downloads/
 - Optional: specify playlist name to create subfolder
+
+The file helpers below are also used by download.py.
 """
 
+import os
 import sys
+import errno
+import queue
 import shutil
+import threading
 from pathlib import Path
+from typing import Iterator
+from concurrent.futures import ThreadPoolExecutor
 
-def flatten_folder(source_dir: Path, playlist_name: str = None):
-    """Move all audio files to flat structure."""
-    
-    audio_extensions = ['.m4a', '.flac', '.mp3', '.opus', '.aac']
-    
-    # Find all audio files recursively
-    audio_files = []
-    for ext in audio_extensions:
-        audio_files.extend(source_dir.rglob(f'*{ext}'))
+AUDIO_EXTENSIONS = frozenset(('.m4a', '.flac', '.mp3', '.opus', '.aac'))
+
+# Threads used to run file moves concurrently
+MOVE_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+
+# Walk entries handed from the listing thread to flatten_folder at a time
+WALK_BATCH_SIZE = 256
+
+def file_suffix(name: str) -> str:
+    """Return the extension of a file name ('.m4a'), or '' if it has none."""
+    _, dot, ext = name.rpartition('.')
+    return dot + ext if dot else ''
+
+def _scandir_recursive(path: str, skip_files_in: str = None) -> Iterator[tuple]:
+    """
+    Walk path once with os.scandir, yielding (entry, kind) with kind
+    'file' or 'dir'. Directories come after their contents (post-order),
+    so they are yielded deepest first. Symlinks are skipped entirely.
+    Files directly inside skip_files_in are not yielded (its subfolders are).
+    Works on plain str paths throughout; callers convert Paths at the boundary.
+    """
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        return  # Directory vanished mid-walk
     
-    # Also include lyrics files
-    lrc_files = list(source_dir.rglob('*.lrc'))
+    skip_files = path == skip_files_in  # Checked once per directory
+    for entry in entries:
+        # Never follow or move symlinks: a link back to ~/Music (or to a parent
+        # folder) would otherwise mean walking far more than Downloads, or a cycle
+        if entry.is_symlink():
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            yield from _scandir_recursive(entry.path, skip_files_in)
+            yield entry, 'dir'
+        elif not skip_files:
+            yield entry, 'file'
+
+def _walk_in_batches(path: str, skip_files_in: str, batches: queue.Queue):
+    """Producer for flatten_folder: put lists of walk entries on batches, then None."""
+    batch = []
+    try:
+        for item in _scandir_recursive(path, skip_files_in):
+            batch.append(item)
+            if len(batch) >= WALK_BATCH_SIZE:
+                batches.put(batch)
+                batch = []
+        if batch:
+            batches.put(batch)
+    finally:
+        batches.put(None)  # Always end the stream so the consumer can't hang
+
+def iter_files(root: Path, extensions: frozenset) -> Iterator[os.DirEntry]:
+    """Yield DirEntry objects for files under root with a suffix in extensions, in one walk."""
+    for entry, kind in _scandir_recursive(os.fspath(root)):
+        if kind == 'file' and file_suffix(entry.name) in extensions:
+            yield entry
+
+def move_file(src: str, dst: str):
+    """
+    Move src to dst. On the same filesystem a plain rename is a
+    metadata-only op; fall back to shutil.move across devices.
+    """
+    try:
+        os.rename(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dst)
+
+def taken_names(directory) -> set:
+    """List a directory once so duplicate checks don't stat each candidate."""
+    if not os.path.isdir(directory):
+        return set()
+    # Case-insensitive, so macOS/Windows never get a silent overwrite
+    return {name.casefold() for name in os.listdir(directory)}
+
+def claim_name(name: str, taken: set) -> str:
+    """Return name, or name_N if already taken, and mark the result taken."""
+    candidate = name
+    if candidate.casefold() in taken:
+        stem, suffix = os.path.splitext(name)
+        counter = 1
+        while candidate.casefold() in taken:
+            candidate = f"{stem}_{counter}{suffix}"
+            counter += 1
+    taken.add(candidate.casefold())
+    return candidate
+
+def flatten_folder(source_dir: str, playlist_name: str = None):
+    """Move all audio files to flat structure. source_dir may be a str or Path."""
+    from rich.progress import Progress
     
+    source_str = os.path.normpath(os.fspath(source_dir))
     if playlist_name:
-        target_dir = source_dir / playlist_name
-        target_dir.mkdir(parents=True, exist_ok=True)
+        # Join onto source_str as-is so target_str has the same form as the
+        # entry.path strings the walk compares it against ('./PL', not 'PL')
+        target_str = os.path.join(source_str, os.path.normpath(playlist_name))
+        os.makedirs(target_str, exist_ok=True)
     else:
-        target_dir = source_dir
+        target_str = source_str
     
-    moved_audio = 0
-    moved_lrc = 0
+    taken = taken_names(target_str)
+    target_prefix = os.path.join(target_str, '')
     
-    # Move audio files
-    for audio_file in audio_files:
-        # Skip files already in target directory (top level)
-        if audio_file.parent == target_dir:
-            continue
-            
-        target_path = target_dir / audio_file.name
-        
-        # Handle duplicates
-        if target_path.exists():
-            stem = audio_file.stem
-            suffix = audio_file.suffix
-            counter = 1
-            while target_path.exists():
-                target_path = target_dir / f"{stem}_{counter}{suffix}"
-                counter += 1
-        
-        shutil.move(str(audio_file), str(target_path))
-        moved_audio += 1
-        print(f"✓ {audio_file.name}")
+    # List directories on a background thread and start moving each batch as
+    # it arrives. Files already at the top of the target folder are left where
+    # they are. Names are claimed here, in walk order, so duplicate naming
+    # doesn't depend on timing.
+    batches = queue.Queue(maxsize=4)
+    threading.Thread(
+        target=_walk_in_batches, args=(source_str, target_str, batches), daemon=True
+    ).start()
     
-    # Move lyrics files
-    for lrc_file in lrc_files:
-        if lrc_file.parent == target_dir:
-            continue
+    moved_audio = 0
+    moved_lrc = 0
+    dirs_to_prune = []  # Deepest first
+    futures = []
+    # Renames are independent and release the GIL, so overlap them
+    with Progress() as progress, ThreadPoolExecutor(max_workers=MOVE_WORKERS) as pool:
+        task = progress.add_task("Moving", total=0)
+        while (batch := batches.get()) is not None:
+            moves = []
+            for entry, kind in batch:
+                if kind == 'dir':
+                    dirs_to_prune.append(entry.path)
+                    continue
+                ext = file_suffix(entry.name)
+                if ext in AUDIO_EXTENSIONS:
+                    moved_audio += 1
+                elif ext == '.lrc':  # Also include lyrics files
+                    moved_lrc += 1
+                else:
+                    continue
+                moves.append((entry.path, target_prefix + claim_name(entry.name, taken)))
             
-        target_path = target_dir / lrc_file.name
-        if target_path.exists():
-            stem = lrc_file.stem
-            counter = 1
-            while target_path.exists():
-                target_path = target_dir / f"{stem}_{counter}.lrc"
-                counter += 1
+            # The total isn't known until the walk ends, so grow it per batch
+            progress.update(task, total=moved_audio + moved_lrc)
+            for src, dst in moves:
+                future = pool.submit(move_file, src, dst)
+                future.add_done_callback(lambda _: progress.advance(task))
+                futures.append(future)
         
-        shutil.move(str(lrc_file), str(target_path))
-        moved_lrc += 1
+        for future in futures:
+            future.result()  # Re-raise any failed move
     
     # Clean up empty directories
-    for item in sorted(source_dir.rglob('*'), reverse=True):
-        if item.is_dir() and item != target_dir:
+    for dir_path in dirs_to_prune:
+        if dir_path != target_str:
             try:
-                item.rmdir()  # Only removes if empty
+                os.rmdir(dir_path)  # Only removes if empty
             except OSError:
                 pass  # Not empty, skip
     
     print(f"\n✅ Moved {moved_audio} audio files, {moved_lrc} lyrics files")
     if playlist_name:
-        print(f"   → {target_dir}/")
+        print(f"   → {os.path.normpath(target_str)}/")
     else:
-        print(f"   → {source_dir}/")
+        print(f"   → {source_str}/")
 
 if __name__ == "__main__":
-    downloads = Path(__file__).parent / "Downloads"
+    downloads = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Downloads")
     
-    if not downloads.exists():
+    if not os.path.isdir(downloads):
         print("❌ Downloads folder not found")
         sys.exit(1)
     
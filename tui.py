@@ -1,46 +1,88 @@
 import os
 import sys
+import functools
 from pathlib import Path
-from typing import Optional, List
-
-from rich.console import Console
-from rich.panel import Panel
-from rich.text import Text
-from InquirerPy import inquirer
-from InquirerPy.base.control import Choice
-from InquirerPy.separator import Separator
-from InquirerPy.validator import PathValidator
-
-# Initialize Rich Console
-console = Console()
-
-def print_banner():
-    """Print the application banner."""
-    console.clear()
+from types import MappingProxyType
+from typing import Optional
+
+# Rich and InquirerPy are imported on first use rather than at module load
+_console = None
+
+def get_console():
+    """Return the shared Rich console, creating it on first use."""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+def __getattr__(name):
+    # Keeps `tui.console` / `from tui import console` working lazily
+    if name == "console":
+        return get_console()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+@functools.lru_cache(maxsize=None)
+def _banner_panel():
+    """The static banner, built once on first use."""
+    from rich.panel import Panel
+    from rich.text import Text
+    
     banner_text = Text(justify="center")
     banner_text.append("\nEnable Apple Music Downloads\n", style="bold cyan")
     banner_text.append("v3.1 (Rebuilt)", style="dim white")
-    console.print(Panel(banner_text, border_style="cyan"))
+    return Panel(banner_text, border_style="cyan")
+
+def print_banner():
+    """Print the application banner."""
+    console = get_console()
+    if console.is_terminal:  # Nothing to clear when output is piped
+        console.clear()
+    console.print(_banner_panel())
+
+# Color and glyph for each kind of status message
+_STYLES = {
+    'ok': ('green', '✓'),
+    'err': ('red', '✗'),
+    'info': ('blue', 'ℹ'),
+    'warn': ('yellow', '⚠'),
+}
+
+def _emit(kind: str, msg: str):
+    """Print a status line as a styled Text, skipping Rich's markup parser."""
+    from rich.text import Text
+    
+    color, glyph = _STYLES[kind]
+    get_console().print(Text(f"{glyph} {msg}", style=color))
 
 def print_success(msg: str):
-    console.print(f"[green]✓ {msg}[/green]")
+    _emit('ok', msg)
 
 def print_error(msg: str):
-    console.print(f"[red]✗ {msg}[/red]")
+    _emit('err', msg)
 
 def print_info(msg: str):
-    console.print(f"[blue]ℹ {msg}[/blue]")
+    _emit('info', msg)
 
 def print_warning(msg: str):
-    console.print(f"[yellow]⚠ {msg}[/yellow]")
-
-def select_format() -> Optional[dict]:
-    """
-    Interactive prompt to select audio format.
-    Returns a dict with 'format', 'extension', and 'desc' or None if exited.
-    """
-    print()
-    choices = [
+    _emit('warn', msg)
+
+# Details for each select_format choice
+_FORMAT_MAP = MappingProxyType({
+    "aac": {"format": "aac-legacy", "extension": "m4a", "desc": "AAC 256kbps"},
+    "alac": {"format": "alac", "extension": "m4a", "desc": "Apple Lossless"},
+    "flac": {"format": "flac", "extension": "flac", "desc": "FLAC (Converted)"},
+    "mp3": {"format": "mp3", "extension": "mp3", "desc": "MP3 320kbps"},
+    "opus": {"format": "opus", "extension": "opus", "desc": "Opus Codec"},
+})
+
+@functools.lru_cache(maxsize=None)
+def _format_choices() -> tuple:
+    """Choices for select_format, built once on first use."""
+    from InquirerPy.base.control import Choice
+    from InquirerPy.separator import Separator
+    
+    return (
         Choice(value="aac", name="🎵 AAC 256 (~7 MB/song) - Standard"),
         Choice(value="alac", name="🎶 ALAC (~30 MB/song) - Lossless"),
         Choice(value="flac", name="💿 FLAC (~35 MB/song) - Converted Lossless"),
@@ -48,11 +90,19 @@ def select_format() -> Optional[dict]:
         Choice(value="opus", name="🔈 Opus (~6 MB/song) - Efficient"),
         Separator(),
         Choice(value=None, name="🔙 Exit")
-    ]
+    )
 
+def select_format() -> Optional[dict]:
+    """
+    Interactive prompt to select audio format.
+    Returns a dict with 'format', 'extension', and 'desc' or None if exited.
+    """
+    from InquirerPy import inquirer
+    
+    print()
     selected_format = inquirer.select(
         message="Select Audio Format:",
-        choices=choices,
+        choices=_format_choices(),
         default="aac",
         pointer=">"
     ).execute()
@@ -60,29 +110,30 @@ def select_format() -> Optional[dict]:
     if selected_format is None:
         return None
 
-    # Return details for the selected format
-    start_format_map = {
-        "aac": {"format": "aac-legacy", "extension": "m4a", "desc": "AAC 256kbps"},
-        "alac": {"format": "alac", "extension": "m4a", "desc": "Apple Lossless"},
-        "flac": {"format": "flac", "extension": "flac", "desc": "FLAC (Converted)"},
-        "mp3": {"format": "mp3", "extension": "mp3", "desc": "MP3 320kbps"},
-        "opus": {"format": "opus", "extension": "opus", "desc": "Opus Codec"},
-    }
-    return start_format_map.get(selected_format)
-
-def find_cookie_files() -> List[Path]:
-    """Find potential cookie files in the current directory."""
-    cwd = Path.cwd()
-    return list(cwd.glob("*.txt"))
-
-def select_cookies_file() -> Optional[Path]:
+    # Return details for the selected format (a copy; callers add keys to it)
+    details = _FORMAT_MAP.get(selected_format)
+    return dict(details) if details else None
+
+def find_cookie_file() -> Optional[str]:
+    """Find a potential cookie file (*.txt) in the current directory."""
+    with os.scandir(os.getcwd()) as it:
+        return next(
+            (entry.path for entry in it
+             if entry.name.endswith(".txt") and entry.is_file(follow_symlinks=False)),
+            None
+        )
+
+def select_cookies_file() -> Optional[str]:
     """
     Interactive prompt to select a cookies file.
     """
+    from InquirerPy import inquirer
+    from InquirerPy.validator import PathValidator
+    
     print()
     # Find likely cookie files to set as default
-    found_cookies = find_cookie_files()
-    default_path = str(found_cookies[0]) if found_cookies else str(Path.home() / "Downloads")
+    found_cookie = find_cookie_file()
+    default_path = found_cookie or str(Path.home() / "Downloads")
 
     print_info("Select your cookies file (use Tab to navigate/autocomplete)")
     
@@ -96,10 +147,12 @@ def select_cookies_file() -> Optional[Path]:
     if not cookies_path_str:
         return None
 
-    return Path(cookies_path_str).expanduser()
+    return os.path.expanduser(cookies_path_str)
 
 def get_url() -> Optional[str]:
     """Prompt for Apple Music URL."""
+    from InquirerPy import inquirer
+    
     print()
     url = inquirer.text(
         message="Enter Apple Music URL (or 'q' to finish):",
@@ -111,11 +164,13 @@ def get_url() -> Optional[str]:
         
     return url.strip()
 
-def destroy_cookies_option(cookies_path: Path):
+def destroy_cookies_option(cookies_path: str):
     """Option to delete the cookies file on exit."""
-    if not cookies_path or not cookies_path.exists():
+    if not cookies_path:
         return
 
+    from InquirerPy import inquirer
+    
     print()
     should_destroy = inquirer.confirm(
         message="Creating a fresh session each time is safer. Destroy cookies file?",
@@ -124,34 +179,45 @@ def destroy_cookies_option(cookies_path: Path):
 
     if should_destroy:
         try:
-            os.remove(cookies_path)
-            print_success(f"Deleted: {cookies_path.name}")
-        except Exception as e:
+            os.unlink(cookies_path)
+            print_success(f"Deleted: {os.path.basename(cookies_path)}")
+        except FileNotFoundError:
+            pass  # Already gone
+        except OSError as e:
             print_error(f"Failed to delete: {e}")
 
 def ask_download_more() -> bool:
     """Ask user if they want to download more."""
+    from InquirerPy import inquirer
+    
     print()
     return inquirer.confirm(
         message="Download more?",
         default=True
     ).execute()
 
+@functools.lru_cache(maxsize=None)
+def _lyrics_choices() -> tuple:
+    """Choices for select_lyrics_option, built once on first use."""
+    from InquirerPy.base.control import Choice
+    
+    return (
+        Choice(value="embedded", name="📝 Embedded (lyrics in audio file)"),
+        Choice(value="lrc", name="📄 .lrc file (separate synced lyrics file)"),
+        Choice(value="none", name="🚫 No lyrics"),
+    )
+
 def select_lyrics_option() -> str:
     """
     Ask user how they want lyrics handled.
     Returns: 'embedded', 'lrc', or 'none'
     """
-    print()
-    choices = [
-        Choice(value="embedded", name="📝 Embedded (lyrics in audio file)"),
-        Choice(value="lrc", name="📄 .lrc file (separate synced lyrics file)"),
-        Choice(value="none", name="🚫 No lyrics"),
-    ]
+    from InquirerPy import inquirer
     
+    print()
     return inquirer.select(
         message="Lyrics option:",
-        choices=choices,
+        choices=_lyrics_choices(),
         default="embedded",
         pointer=">"
     ).execute()